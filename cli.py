@@ -13,13 +13,19 @@ Passes a dictionary with info to appropriate files or functions.
 import os
 import sys
 import argparse
-import datetime
+import functools
 import json
-
-# import files
-from report import *
-from organization import *
-from visual import *
+import re
+import typing
+from datetime import datetime
+from typing import Union
+
+# project files (report, organization, visual) are imported where needed
+# so --help, --version, --saveconfig and bad args exit without loading them
+if typing.TYPE_CHECKING:
+    from organization import Organization
+    from report import Report
+    from ticketclasses import Ticket, User
 
 # program and release information
 PROGRAM_NAME = "tstat CLI"
@@ -29,17 +35,61 @@ Download latest release from https://github.com/uoclass/tstat/releases"""
 PROGRAM_AUTHORS = "by Alex JPS, Eric Edwards, Alexa Roskowski"
 
 # constants
-COLORS: list[str] = ["white", "black", "gray", "yellow", "red", "blue", "green", "brown", "pink", "orange", "purple"]
-DATE_FORMATS: list[str] = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%d.%m.%y"]
-QUERY_TYPES = ["perweek", "perbuilding", "perroom", "perrequestor", "showtickets", "perdiagnosis"]
+COLORS: tuple[str, ...] = ("white", "black", "gray", "yellow", "red", "blue", "green", "brown", "pink", "orange",
+                           "purple")
+DATE_FORMATS: tuple[str, ...] = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%d.%m.%y")
+# zero-padded dates pick their format by (length, separator) without trial and error
+DATE_FORMATS_BY_SHAPE: dict[tuple[int, str], str] = {
+    (len(datetime(2000, 12, 31).strftime(date_format)), date_format[2]): date_format
+    for date_format in DATE_FORMATS
+}
+# regex for each strptime directive in DATE_FORMATS, as lenient as strptime itself:
+# %m and %d may be unpadded and strptime also takes a space-padded %d (e.g. 1/ 5/2023)
+DATE_DIRECTIVE_PATTERNS: dict[str, str] = {"%Y": r"\d{4}", "%y": r"\d{2}", "%m": r"\d{1,2}", "%d": r"(?:\d{1,2}| \d)"}
+# any numeric date (including unpadded e.g. 5/15/2023), one group per format in DATE_FORMATS
+# so the index of the matching group picks the format
+DATE_PATTERN: re.Pattern = re.compile("|".join(
+    "(" + re.sub(r"%[Yymd]|.", lambda part: DATE_DIRECTIVE_PATTERNS.get(part.group(), re.escape(part.group())),
+                 date_format) + ")"
+    for date_format in DATE_FORMATS))
+QUERY_TYPES: tuple[str, ...] = ("perweek", "perbuilding", "perroom", "perrequestor", "showtickets", "perdiagnosis")
+# for membership checks, QUERY_TYPES keeps the order shown in --help
+QUERY_TYPES_SET: frozenset[str] = frozenset(QUERY_TYPES)
+# query type -> (filter args it cannot be given, error message) used by check_options()
+QUERY_FORBIDDEN_ARGS: dict[str, tuple[tuple[str, ...], str]] = {
+    "perbuilding": (("building",), "Cannot filter to a single building in a perbuilding query"),
+    "perdiagnosis": (("diagnoses", "anddiagnoses"), "Cannot filter diagnoses in a perdiagnosis query"),
+    "perrequestor": (("remail", "rname", "rphone"), "Cannot pass any requestor filters with perrequestor query"),
+    "showtickets": (("prune",), "Cannot pass --prune with showtickets query")
+}
+# query type -> (Organization method, visual.py function) used by run_query()
+QUERY_DISPATCH: dict[str, tuple[str, str]] = {
+    "perweek": ("per_week", "view_per_week"),
+    "perbuilding": ("per_building", "view_per_building"),
+    "perroom": ("per_room", "view_per_room"),
+    "perrequestor": ("per_requestor", "view_per_requestor"),
+    "showtickets": ("show_tickets", "view_show_tickets"),
+    "perdiagnosis": ("per_diagnosis", "view_per_diagnosis")
+}
+# report fields (see report.STANDARD_FIELDS) a query type cannot run without
+REQUIRED_FIELDS: dict[str, frozenset[str]] = {
+    "perweek": frozenset({"created"}),
+    "perbuilding": frozenset({"building"}),
+    "perroom": frozenset({"building", "room_identifier"})
+}
 DEFAULT_TRACEBACK = 0
 DEBUG_TRACEBACK = 3
 
+# accepted spellings for the --prune argument
+PRUNE_TRUE_WORDS: frozenset[str] = frozenset({"t", "true", "y", "yes", "on"})
+PRUNE_FALSE_WORDS: frozenset[str] = frozenset({"f", "false", "n", "no", "off"})
+
 # for args that may be included in a config file
-STANDARD_ARGS = ["localreport", "name", "color", "termstart", "termend", "weeks", "building", "remail", "rname",
-                 "rphone", "diagnoses", "anddiagnoses", "head", "tail", "querytype", "daliases"]
+STANDARD_ARGS: tuple[str, ...] = ("localreport", "name", "color", "termstart", "termend", "weeks", "building",
+                                  "remail", "rname", "rphone", "diagnoses", "anddiagnoses", "head", "tail",
+                                  "querytype", "daliases")
 # args that should not be in a config file
-EXCLUDE_ARGS = ["version", "debug", "nographics", "printquery", "saveconfig", "config"]
+EXCLUDE_ARGS: tuple[str, ...] = ("version", "debug", "nographics", "printquery", "saveconfig", "config")
 
 # default name of diagnoses aliases file
 DEFAULT_DIAGNOSES_ALIASES_FILE = "diagnoses.json"
@@ -62,11 +112,11 @@ def check_file(filename: str, filetype: str) -> bool:
         # no filename provided
         return False
     filename = filename.strip()
-    if not (os.path.exists(filename)):
-        # file does not exist
+    if not filename.lower().endswith(f".{filetype.lower()}"):
+        # file extension not of desired filetype, no need to touch the disk
         return False
-    if (os.path.splitext(filename)[-1].lower()) != f".{filetype.lower()}":
-        # file extension not of desired filetype
+    if not os.path.isfile(filename):
+        # file does not exist (or is a directory)
         return False
     return True
 
@@ -76,12 +126,42 @@ def get_datetime(date_text: str):
     Checks that given string adheres to one of DATE_FORMATS.
     Returns datetime object. Error if not recognized.
     """
-    for date_format in DATE_FORMATS:
+    # strip once and intern, so equal dates share one cache entry in parse_date()
+    return parse_date(sys.intern(date_text.strip()))
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(date_text: str) -> datetime:
+    """
+    Parse a stripped date string using DATE_FORMATS.
+    Results are cached, repeated strings skip parsing entirely.
+    """
+    # fast path for yyyy-mm-dd, avoids a failed strptime per format
+    # only take it for that exact shape, fromisoformat also accepts e.g. 19700101 or 2023-W01-1
+    if len(date_text) == 10 and date_text[4] == "-" and date_text[7] == "-":
+        try:
+            return datetime.fromisoformat(date_text)
+        except ValueError:
+            pass
+
+    # separator is the 3rd char (mm/dd/yyyy) or else the 5th (yyyy-mm-dd)
+    separator: str = date_text[2:3] if not date_text[2:3].isdigit() else date_text[4:5]
+    shape_format: str = DATE_FORMATS_BY_SHAPE.get((len(date_text), separator))
+    strptime = datetime.strptime
+    if shape_format:
         try:
-            result_date: datetime = datetime.strptime(date_text, date_format)
-            return result_date
+            return strptime(date_text, shape_format)
         except ValueError:
-            continue
+            pass
+
+    # no match by shape (e.g. unpadded 5/15/2023), classify with DATE_PATTERN
+    # the pattern accepts every date strptime would parse with DATE_FORMATS, so no trial loop needed
+    date_match: re.Match = DATE_PATTERN.fullmatch(date_text)
+    if date_match:
+        try:
+            return strptime(date_text, DATE_FORMATS[date_match.lastindex - 1])
+        except ValueError:
+            pass
     raise BadArgError(f"Date {date_text} not recognized, try yyyy-mm-dd")
 
 
@@ -91,48 +171,43 @@ def check_options(args: dict) -> None:
     This expects a fully completed args dict.
     i.e. called after load_config(), if applicable.
     """
+    # look up args used by several stipulations once
+    debug: bool = args.get("debug")
+    query_type: str = args.get("querytype")
+    head: int = args.get("head")
+    tail: int = args.get("tail")
+    weeks: int = args.get("weeks")
+
     # Debug stipulations
-    if not args.get("debug") and args.get("nographics"):
+    if not debug and args.get("nographics"):
         raise BadArgError("Cannot pass --nographics without --debug flag")
-    if not args.get("debug") and args.get("printquery"):
+    if not debug and args.get("printquery"):
         raise BadArgError("Cannot pass --printquery without --debug flag")
 
     # Must select a querytype if not loading
-    if not args.get("config") and args.get("querytype") not in QUERY_TYPES:
+    if not args.get("config") and query_type not in QUERY_TYPES_SET:
         raise BadArgError("Must select a query type")
 
     # Query result cropping stipulations
-    if args.get("head") is not None and args.get("tail") is not None:
+    if head is not None and tail is not None:
         raise BadArgError("Cannot pass --head and --tail simultaneously")
-    if args.get("head") is not None and args.get("head") < 0:
-        raise BadArgError(f"Cannot pass --head {args['head']}, pass at least 1")
-    if args.get("tail") is not None and args.get("tail") < 0:
-        raise BadArgError(f"Cannot pass --tail {args['tail']}, pass at least 1")
-
-    # Stipulations for perbuilding
-    if args["querytype"] == "perbuilding" and args.get("building"):
-        raise BadArgError("Cannot filter to a single building in a perbuilding query")
+    if head is not None and head < 0:
+        raise BadArgError(f"Cannot pass --head {head}, pass at least 1")
+    if tail is not None and tail < 0:
+        raise BadArgError(f"Cannot pass --tail {tail}, pass at least 1")
 
-    # Stipulations for perdiagnosis
-    if args["querytype"] == "perdiagnosis" and (args.get("diagnoses") or args.get("anddiagnoses")):
-        raise BadArgError("Cannot filter diagnoses in a perdiagnosis query")
+    # Stipulations for perbuilding, perdiagnosis, perrequestor and showtickets
+    forbidden_args, forbidden_message = QUERY_FORBIDDEN_ARGS.get(query_type, ((), None))
+    if any(args.get(arg) for arg in forbidden_args):
+        raise BadArgError(forbidden_message)
 
     # Stipulations for perweek
-    if args["querytype"] != "perweek" and args.get("weeks") is not None:
+    if query_type != "perweek" and weeks is not None:
         raise BadArgError("Cannot pass --weeks without --perweek")
-    if args.get("weeks") and args.get("termend"):
+    if weeks and args.get("termend"):
         raise BadArgError("Cannot pass --weeks and --termend simultaneously")
-    if args.get("weeks") is not None and args.get("weeks") < 0:
-        raise BadArgError(f"Cannot pass --weeks {args['weeks']}, use at least 1 week")
-
-    # Stipulations for perrequestor
-    if args["querytype"] == "perrequestor" and \
-            (args.get("remail") or args.get("rname") or args.get("rphone")):
-        raise BadArgError("Cannot pass any requestor filters with perrequestor query")
-
-    # Stipulations for showtickets
-    if args["querytype"] == "showtickets" and args.get("prune"):
-        raise BadArgError("Cannot pass --prune with showtickets query")
+    if weeks is not None and weeks < 0:
+        raise BadArgError(f"Cannot pass --weeks {weeks}, use at least 1 week")
 
     # Stipulations for localreport
     # must have localreport unless saving config
@@ -140,28 +215,34 @@ def check_options(args: dict) -> None:
         raise BadArgError("Must specify a report file using --localreport flag")
 
 
-def clean_args(args: dict, org: Organization) -> None:
+def clean_args(args: dict, org: "Organization") -> None:
     """
     Fix formatting by changing datatypes of some args.
     e.g. Change date-related args to datetime.
     """
-    # ensure valid date formats
-    if args.get("termstart"):
-        args["termstart"] = get_datetime(args["termstart"])
-    if args.get("termend"):
-        args["termend"] = get_datetime(args["termend"])
+    # look up args used more than once
+    termstart = args.get("termstart")
+    termend = args.get("termend")
+    building: str = args.get("building")
+    remail: str = args.get("remail")
+    rname: str = args.get("rname")
+    rphone: str = args.get("rphone")
+
+    # ensure valid date formats, dates already given as datetime are kept
+    if termstart and not isinstance(termstart, datetime):
+        args["termstart"] = get_datetime(termstart)
+    if termend and not isinstance(termend, datetime):
+        args["termend"] = get_datetime(termend)
 
     # use building object
-    if args.get("building"):
-        args["building"] = org.find_building(args["building"])
+    if building:
+        args["building"] = org.find_building(building)
         if not args["building"]:
             raise BadArgError("No such building found in report")
 
     # find actual requestor object
-    if args.get("remail") or args.get("rname") or args.get("rphone"):
-        requestors_filter: list[User] = org.find_user(args.get("remail"),
-                                                      args.get("rname"),
-                                                      args.get("rphone"))
+    if remail or rname or rphone:
+        requestors_filter: list["User"] = org.find_user(remail, rname, rphone)
         # print message based on number of matches
         if len(requestors_filter) == 1:
             print(f"Filtering to requestor {requestors_filter[0]}")
@@ -177,18 +258,21 @@ def clean_args(args: dict, org: Organization) -> None:
     # set zeroes and empty strings to None
     # helps user pass empty quotes to override json args to None
     for key in STANDARD_ARGS:
-        if args.get(key) == "":
+        value = args.get(key)
+        if value == "":
             print(f"Empty value passed for {key}, ignoring")
             args[key] = None
-        if args.get(key) == 0:
+        elif value == 0:
             print(f"Value 0 passed for {key}, ignoring")
             args[key] = None
 
     # interpret prune flag as bool
-    if args.get("prune"):
-        if args.get("prune").lower() in ["t", "true", "y", "yes", "on"]:
+    prune: str = args.get("prune")
+    if prune:
+        prune = prune.lower()
+        if prune in PRUNE_TRUE_WORDS:
             args["prune"] = True
-        elif args.get("prune").lower() in ["f", "false", "n", "no", "off"]:
+        elif prune in PRUNE_FALSE_WORDS:
             args["prune"] = False
         else:
             raise BadArgError("Pass either true or false for the prune argument")
@@ -217,60 +301,47 @@ def rename_diagnoses(args: dict) -> None:
         # no diagnoses filtering at all
         raise ValueError("Neither 'diagnoses' nor 'anddiagnoses' contain values")
 
-    # split string into list and strip diagnoses names
-    diagnoses_list: list[str] = diagnoses_filter.split(",")
-    for i in range(len(diagnoses_list)):
-        diagnoses_list[i] = "".join(
-            char.lower() for char in diagnoses_list[i] if char.isalpha()
-        )
+    from organization import canonicalize_diagnosis
+    from report import load_alias_mappings
 
-    # if no diagnoses aliases file, finish here
-    if not args.get("daliases"):
-        args[diagnoses_filter_type] = diagnoses_list
-        return
+    # display names by canonical name
+    alias_mappings: dict[str, str] = load_alias_mappings(args["daliases"]) if args.get("daliases") else {}
+
+    # split, canonicalize and rename in one pass, giving args dict the new diagnoses list
+    # names left empty (e.g. from a trailing comma) would never match a ticket, so drop them
+    # if no alias mapping, just keep the canonical diagnosis name
+    renamed_diagnoses: list[str] = [alias_mappings.get(canonical) or canonical
+                                    for canonical in map(canonicalize_diagnosis, diagnoses_filter.split(","))
+                                    if canonical]
+    if not renamed_diagnoses:
+        # an empty list would turn the filter off and match every ticket
+        raise BadArgError(f"No valid diagnoses in --{diagnoses_filter_type} {diagnoses_filter!r}")
+    args[diagnoses_filter_type] = renamed_diagnoses
 
-    # diagnoses aliases file present
-    aliases_file: typing.TextIO = open(args["daliases"], mode="r", encoding="utf-8-sig")
-    alias_mappings: dict[str, str] = json.load(aliases_file)
-
-    # replace diagnoses with display names from diagnoses aliases file
-    # if no alias mapping, just keep original diagnosis name
-    for i in range(len(diagnoses_list)):
-        # canonize string to use as key to find mapping
-        canon_diagnosis: str = "".join(
-            char for char in diagnoses_list[i] if char.isalpha()
-        )
-        if alias_mappings.get(canon_diagnosis):
-            # replace with display name if one is given by aliases file
-            diagnoses_list[i] = alias_mappings[canon_diagnosis]
-    aliases_file.close()
-
-    # give args dict the new diagnoses list
-    args[diagnoses_filter_type] = diagnoses_list
-
-def check_report(args: dict, report: Report) -> None:
+
+def check_report(args: dict, report: "Report") -> None:
     """
     For the requested query type,
     Halt program if report does not contain correct info.
     """
+    from report import STANDARD_FIELDS
+
     query_type = args["querytype"]
-    if query_type == "perweek":
-        if "created" not in report.fields_present:
-            raise BadArgError("Cannot run tickets-per-week query, no created field in report")
-    if query_type == "perbuilding":
-        if "building" not in report.fields_present:
-            raise BadArgError(
-                "Cannot run a tickets-per-building query, no building field in report")
-    if query_type == "perroom":
-        if ("building" not in report.fields_present) or ("room_identifier" not in report.fields_present):
-            raise BadArgError(
-                "Cannot run a tickets-per-room query, no building and room identifier fields in report")
+    missing_fields: frozenset[str] = REQUIRED_FIELDS.get(query_type, frozenset()).difference(report.fields_present)
+    if missing_fields:
+        # name the report columns, as check_fields() does, not the internal attribute keys
+        column_names: list[str] = [f"\"{STANDARD_FIELDS[field][0]}\"" for field in sorted(missing_fields)]
+        plural: str = "s" if len(column_names) > 1 else ""
+        raise BadArgError(f"Cannot run a {query_type} query, "
+                          f"no {' and '.join(column_names)} field{plural} in report")
 
 
+@functools.lru_cache(maxsize=1)
 def parser_setup():
     """
     Set up argument parser with needed arguments.
     Return the parser.
+    Built once and reused, parse_args() does not modify the parser.
     """
     parser: argparse.ArgumentParser = argparse.ArgumentParser()
 
@@ -323,49 +394,22 @@ def parser_setup():
     return parser
 
 
-def run_query(args: dict, org: Organization) -> Union[dict, list[Ticket]]:
+def run_query(args: dict, org: "Organization") -> Union[dict, list["Ticket"]]:
     """
     Run query with given args on given org.
     Return results, call appropriate visual.py function.
     """
-    query_type: dict = args["querytype"]
-    query_result: Union[dict, list[Ticket]] = {}
-
-    # determine query, run, and save results
-    if query_type == "perweek":
-        tickets_per_week = org.per_week(args)
-        if not args.get("nographics"):
-            view_per_week(tickets_per_week, args)
-        query_result = tickets_per_week
-    if query_type == "perbuilding":
-        tickets_per_building = org.per_building(args)
-        if not args.get("nographics"):
-            view_per_building(tickets_per_building, args)
-        query_result = tickets_per_building
-    if query_type == "perroom":
-        tickets_per_room = org.per_room(args)
-        if not args.get("nographics"):
-            view_per_room(tickets_per_room, args)
-        query_result = tickets_per_room
-    if query_type == "perrequestor":
-        tickets_per_requestor = org.per_requestor(args)
-        if not args.get("nographics"):
-            view_per_requestor(tickets_per_requestor, args)
-        query_result = tickets_per_requestor
-    if query_type == "showtickets":
-        tickets_matched: list[Ticket] = filter_tickets(org.tickets, args)
-        if not args.get("nographics"):
-            view_show_tickets(tickets_matched, args)
-        query_result = tickets_matched
-    if query_type == "perdiagnosis":
-        tickets_per_diagnosis = org.per_diagnosis(args)
-        if not args.get("nographics"):
-            view_per_diagnosis(tickets_per_diagnosis, args)
-        query_result = tickets_per_diagnosis
-
+    # look up query and view functions, run, and save results
+    query_type: str = args["querytype"]
+    org_method, view_function = QUERY_DISPATCH[query_type]
+    query_result: Union[dict, list["Ticket"]] = getattr(org, org_method)(args)
+    if not args.get("nographics"):
+        # matplotlib is only loaded when there is something to show
+        import visual
+        getattr(visual, view_function)(query_result, args)
 
     # print query results if option enabled
-    if args.get("printquery") and args["querytype"] != "showtickets":
+    if args.get("printquery") and query_type != "showtickets":
         print(query_result)
 
     return query_result
@@ -384,22 +428,22 @@ def save_config(args_dict: dict, config_path: str):
     if not config_path.endswith(".json"):
         config_path += ".json"
 
-    file = open(config_path, "w+")
-    json.dump(args_dict, file, indent=4)
+    # serialize up front so the file gets one write, not one per token
+    config_text: str = json.dumps(args_dict, indent=4)
+    with open(config_path, "w") as file:
+        file.write(config_text)
 
     print(f"Saved current configuration to {config_path}")
 
-    file.close()
-
 
 def load_config(args: dict):
     """
     Load configuration file.
     Overwrite json args with user args.
     """
-    file = open(args.get("config"))
-    json_args = json.load(file)
-    file.close()
+    # read in one go and parse the string, configs are small
+    with open(args.get("config")) as file:
+        json_args: dict = json.loads(file.read())
     args.pop("config")
 
     # loop thru standard args dict keys
@@ -409,6 +453,14 @@ def load_config(args: dict):
             args[arg] = json_args.get(arg)
 
 
+def print_version() -> None:
+    """
+    Print program name, version, and authors, then exit.
+    """
+    print(f"{PROGRAM_NAME} {RELEASE_VERSION}\n{PROGRAM_AUTHORS}")
+    exit()
+
+
 def main(argv) -> None:
     """
     Parse arguments, call basic input validation.
@@ -421,15 +473,18 @@ def main(argv) -> None:
     if len(argv) < 1:
         raise BadArgError("No arguments provided")
 
+    # display version if requested, no need to set up the parser for it
+    if "--version" in argv:
+        print_version()
+
     # set up parsers and parse into dict
     parser: argparse.ArgumentParser = parser_setup()
 
     args: dict = vars(parser.parse_args(argv))
 
-    # display version if requested
+    # abbreviated flag (e.g. --vers) only recognized by the parser
     if args.get("version"):
-        print(f"{PROGRAM_NAME} {RELEASE_VERSION}\n{PROGRAM_AUTHORS}")
-        exit()
+        print_version()
 
     # set debug mode
     sys.tracebacklimit = DEBUG_TRACEBACK if args.get("debug") else DEFAULT_TRACEBACK
@@ -438,7 +493,8 @@ def main(argv) -> None:
         load_config(args)
 
     # if no diagnoses aliases file provided, use default if it's valid
-    if not args.get("daliases") and check_file(DEFAULT_DIAGNOSES_ALIASES_FILE, "JSON"):
+    using_default_daliases: bool = not args.get("daliases") and check_file(DEFAULT_DIAGNOSES_ALIASES_FILE, "JSON")
+    if using_default_daliases:
         args["daliases"] = DEFAULT_DIAGNOSES_ALIASES_FILE
 
     # atp we expect a fully completed args dict
@@ -452,8 +508,8 @@ def main(argv) -> None:
     if args.get("localreport") and not check_file(args["localreport"], "CSV"):
         raise BadArgError("Invalid local report CSV file provided")
 
-    # check for valid diagnoses JSON, if provided
-    if args.get("daliases") and not check_file(args["daliases"], "JSON"):
+    # check for valid diagnoses JSON, if provided (default file was checked above)
+    if args.get("daliases") and not using_default_daliases and not check_file(args["daliases"], "JSON"):
         raise BadArgError("Invalid diagnoses aliases JSON file provided")
 
     # FIXME end section to be refactored into validity-checking function
@@ -463,6 +519,10 @@ def main(argv) -> None:
         save_config(args, args["saveconfig"])
         return
 
+    # a query will run, load the report and organization modules
+    from report import Report
+    from organization import Organization
+
     # check report has enough info for query
     report = Report(args["localreport"], args["daliases"])
     check_report(args, report)
@@ -8,13 +8,22 @@ and managing Organization attributes (departments, users, etc.)
 """
 
 # Packages
-from typing import Union
+import sys
+from collections import Counter
+from itertools import chain
+from typing import Iterator, Union
 
 # Files
 from ticketclasses import *
 
 # Constants
 DEFAULT_WEEKS = 11
+# reference point for get_timestamp(), times in reports are naive
+EPOCH = datetime(1970, 1, 1)
+WEEK_MICROSECONDS = 7 * 24 * 60 * 60 * 1_000_000
+# ASCII translation table for canonicalize_diagnosis(), lowercases letters and deletes everything else
+CANONICAL_ASCII_TABLE: dict[int, Union[str, None]] = {code: (chr(code).lower() if chr(code).isalpha() else None)
+                                                       for code in range(128)}
 
 
 class Organization:
@@ -27,6 +36,7 @@ class Organization:
     departments: dict[str, Department]
     groups: dict[str, Group]
     tickets: dict[int, Ticket]
+    earliest_created: Union[datetime, None]
 
     def __init__(self) -> None:
         self.buildings = {}
@@ -34,6 +44,8 @@ class Organization:
         self.departments = {}
         self.groups = {}
         self.tickets = {}
+        # kept up to date by add_new_ticket() for per_week()
+        self.earliest_created = None
 
     def __str__(self) -> str:
         return f"""buildings: {len(self.buildings)} 
@@ -51,12 +63,8 @@ tickets: {len(self.tickets)}"""
         And add to lists of tickets from on-campus entities.
         """
         # check for valid ticket
-        try:
-            assert type(ticket.id) == int
-            # created and modified should be datetime or None
-            assert type(ticket.created) != str
-            assert type(ticket.modified) != str
-        except AssertionError:
+        # created and modified should be datetime or None
+        if not isinstance(ticket.id, int) or isinstance(ticket.created, str) or isinstance(ticket.modified, str):
             raise ValueError("Organization.add_new_ticket() received invalid ticket")
 
         # add ticket to entities' lists and to org's dict
@@ -66,18 +74,19 @@ tickets: {len(self.tickets)}"""
         ticket.responsible_group.tickets.append(ticket)
         ticket.department.tickets.append(ticket)
 
+        # values filter_tickets() compares, computed once here rather than per query
+        set_filter_values(ticket)
+
+        # track earliest creation time so per_week() need not scan for it
+        if ticket.created and (self.earliest_created is None or ticket.created < self.earliest_created):
+            self.earliest_created = ticket.created
+
     def find_group(self, name: str = "Undefined", create_mode: bool = False) -> Union[None, Group]:
         """
         Return group with name if already exists.
         Otherwise add new group and return.
         """
-        name = name if name else "Undefined"
-        if self.groups.get(name):
-            return self.groups[name]
-        if create_mode:
-            self.groups[name] = Group(name)
-            return self.groups[name]
-        return None
+        return find_named_entity(self.groups, Group, name, create_mode)
 
     def find_user(self, email: str = None, name: str = None, phone: str = None, create_mode: bool = False) -> list[
         User]:
@@ -92,14 +101,15 @@ tickets: {len(self.tickets)}"""
             """
             Fast dict lookup via email.
             """
-            if not self.users.get(email):
+            email_users: list[User] = self.users.get(email)
+            if not email_users:
                 return []
             if not (name or phone):
                 # just return user list at given key
-                return self.users.get(email)
+                return email_users
             # lookup via email but match other attributes too
             matches: list[User] = []
-            for found in self.users.get(email):
+            for found in email_users:
                 if (not name or name == found.name) and \
                         (not phone or phone == found.phone):
                     matches.append(found)
@@ -110,8 +120,8 @@ tickets: {len(self.tickets)}"""
             Iterate thru all users for name and/or phone.
             """
             matches: list[User] = []
-            for key in self.users.keys():
-                for found in self.users[key]:
+            for email_users in self.users.values():
+                for found in email_users:
                     if (not name or name == found.name) and \
                             (not phone or phone == found.phone):
                         matches.append(found)
@@ -119,6 +129,9 @@ tickets: {len(self.tickets)}"""
 
         if not (email or name or phone or create_mode):
             return []
+        if email:
+            # users are keyed on canonical email, interned as in find_named_entity()
+            email = sys.intern(canonicalize_email(email))
 
         # run appropriate lookup
         lookup_results: list[User] = []
@@ -136,10 +149,8 @@ tickets: {len(self.tickets)}"""
             user_email = email if email else "Undefined"
             user_name = name if name else "Undefined"
             user_phone = phone if phone else "Undefined"
-            if not self.users.get(user_email):
-                self.users[user_email] = []
             new_user: User = User(user_email, user_name, user_phone)
-            self.users[user_email].append(new_user)
+            self.users.setdefault(user_email, []).append(new_user)
             return [new_user]
 
         # nothing found and no creating
@@ -150,13 +161,7 @@ tickets: {len(self.tickets)}"""
         Return department with name if already exists.
         Otherwise add new department and return.
         """
-        name = name if name else "Undefined"
-        if self.departments.get(name):
-            return self.departments[name]
-        if create_mode:
-            self.departments[name] = Department(name)
-            return self.departments[name]
-        return None
+        return find_named_entity(self.departments, Department, name, create_mode)
 
     def find_room(self, building_name: str = "Undefined",
                   room_identifier: str = "Undefined",
@@ -166,28 +171,23 @@ tickets: {len(self.tickets)}"""
         Otherwise add new room or building as needed and return.
         """
         building_name = building_name if building_name else "Undefined"
-        room_identifier = room_identifier if room_identifier else "Undefined"
+        room_identifier = sys.intern(room_identifier) if room_identifier else "Undefined"
         building: Building = self.find_building(building_name, create_mode)
-        if building:
-            if building.rooms.get(room_identifier):
-                return building.rooms[room_identifier]
-            if create_mode:
-                building.rooms[room_identifier] = Room(building, room_identifier)
-                return building.rooms[room_identifier]
-        return None
+        if not building:
+            return None
+        rooms: dict[str, Room] = building.rooms
+        room: Room = rooms.get(room_identifier)
+        if room is None and create_mode:
+            room = Room(building, room_identifier)
+            rooms[room_identifier] = room
+        return room
 
     def find_building(self, name: str = "Undefined", create_mode: bool = False) -> Union[None, Building]:
         """
         Return building with name if already exists.
         If create_mode, return a new building if none found.
         """
-        name = name if name else "Undefined"
-        if self.buildings.get(name):
-            return self.buildings[name]
-        if create_mode:
-            self.buildings[name] = Building(name)
-            return self.buildings[name]
-        return None
+        return find_named_entity(self.buildings, Building, name, create_mode)
 
     def per_week(self, args: dict) -> dict[datetime, int]:
         """
@@ -200,12 +200,8 @@ tickets: {len(self.tickets)}"""
             # start date provided
             first_week: datetime = args["termstart"]
         else:
-            # find first week by earliest ticket
-            for id in self.tickets:
-                if not first_week:
-                    first_week: datetime = self.tickets[id].created
-                if self.tickets[id].created < first_week:
-                    first_week: datetime = self.tickets[id].created
+            # first week by earliest ticket
+            first_week: datetime = self.earliest_created
         # use the first day of the week
         first_week = get_monday(first_week)
         print(f"Using {first_week} as first week")
@@ -226,25 +222,27 @@ tickets: {len(self.tickets)}"""
             print(f"Using default {DEFAULT_WEEKS}-week term")
             last_week: datetime = first_week + (DEFAULT_WEEKS - 1) * timedelta(days=7)
 
-        # dict of the ticket counts per week
-        week_counts: dict[datetime, int] = {}
+        # Mondays of the term, counts are kept by index into this list
+        weeks: list[datetime] = []
         week_i: datetime = first_week
         while week_i <= last_week:
-            week_counts[week_i] = 0
+            weeks.append(week_i)
             week_i += timedelta(days=7)
+        counts: list[int] = [0] * len(weeks)
 
         # apply filtering AFTER term start decided
-        filtered_tickets = filter_tickets(self.tickets, args, ["termstart", "termend"])
+        filtered_tickets = iter_filtered_tickets(self.tickets, args, ["termstart", "termend"])
 
-        # sort tickets into week_counts
+        # sort tickets into counts, first_week is a Monday midnight so whole weeks
+        # since then give the index without finding each ticket's Monday
+        first_week_ts: int = get_timestamp(first_week)
         for ticket in filtered_tickets:
-            ticket_week = get_monday(ticket.created)
-            if ticket_week >= first_week and ticket_week <= last_week:
-                # start counting with week 1
-                week_counts[ticket_week] += 1
+            week_index: int = (get_created_ts(ticket) - first_week_ts) // WEEK_MICROSECONDS
+            if 0 <= week_index < len(counts):
+                counts[week_index] += 1
 
-        # return list of ticket counts per week
-        return week_counts
+        # return dict of ticket counts per week
+        return dict(zip(weeks, counts))
 
     def per_building(self, args: dict) -> dict[Building, int]:
         """
@@ -254,13 +252,14 @@ tickets: {len(self.tickets)}"""
         # dict for buildings
         building_count: dict[Building, int] = {}
 
-        # run filtering and count on each room
-        for building_name in self.buildings:
-            building = self.buildings[building_name]
+        for building in self.buildings.values():
             building_count[building] = 0
-            for room_identifier in building.rooms:
-                room = building.rooms[room_identifier]
-                building_count[building] += len(filter_tickets(room.tickets, args))
+
+        # filter once and count each passing ticket against its room's building
+        for ticket in iter_filtered_tickets(self.tickets, args):
+            building: Building = ticket.room.building
+            if building in building_count:
+                building_count[building] += 1
 
         # return dict of counts per building
         return building_count
@@ -276,13 +275,18 @@ tickets: {len(self.tickets)}"""
         # ensure we have a building and not empty/None
         building: Building = args.get("building")
         if building:
-            for room_identifier in building.rooms:
-                room = building.rooms[room_identifier]
-                room_count[room] = len(filter_tickets(room.tickets, args, ["building"]))
+            for room in building.rooms.values():
+                room_count[room] = 0
         else:
             for bldg in self.buildings.values():
                 for rm in bldg.rooms.values():
-                    room_count[rm] = len(filter_tickets(rm.tickets, args))
+                    room_count[rm] = 0
+
+        # filter once and count each passing ticket against its room
+        # the building filter (if any) keeps tickets to that building's rooms
+        for ticket in iter_filtered_tickets(self.tickets, args):
+            if ticket.room in room_count:
+                room_count[ticket.room] += 1
 
         # return dict of counts per room
         return room_count
@@ -293,9 +297,14 @@ tickets: {len(self.tickets)}"""
         This information is meant to be used as input for graphing purposes.
         """
         requestor_count: dict[User, int] = {}
-        for key in self.users.keys():
-            for requestor in self.users[key]:
-                requestor_count[requestor] = len(filter_tickets(requestor.tickets, args))
+        for email_users in self.users.values():
+            for requestor in email_users:
+                requestor_count[requestor] = 0
+
+        # filter once and count each passing ticket against its requestor
+        for ticket in iter_filtered_tickets(self.tickets, args):
+            if ticket.requestor in requestor_count:
+                requestor_count[ticket.requestor] += 1
 
         # return dict of counts per requestor
         return requestor_count
@@ -305,26 +314,105 @@ tickets: {len(self.tickets)}"""
         Return a dict counting tickets by diagnosis.
         Tickets with multiple diagnoses will be counted multiple times.
         """
-        diagnoses_count: dict[str, int] = {}
-        filtered_tickets = filter_tickets(self.tickets, args, [])
-        for ticket in filtered_tickets:
-            for diagnosis in ticket.diagnoses:
-                if diagnoses_count.get(diagnosis):
-                    diagnoses_count[diagnosis] += 1
-                else:
-                    diagnoses_count[diagnosis] = 1
-        return diagnoses_count
+        filtered_tickets = iter_filtered_tickets(self.tickets, args, [])
+        # Counter tallies the chained diagnoses in C, one hash per diagnosis
+        diagnoses_count: Counter = Counter(chain.from_iterable(ticket.diagnoses for ticket in filtered_tickets))
+        # plain dict, so printed query results look the same
+        return dict(diagnoses_count)
+
+    def show_tickets(self, args: dict) -> list[Ticket]:
+        """
+        Return a list of all tickets matching the filters in args.
+        """
+        return filter_tickets(self.tickets, args)
 
 # Helper functions
 
+def canonicalize_diagnosis(diagnosis: str) -> str:
+    """
+    Return diagnosis name reduced to lowercase letters only.
+    Used to compare diagnoses and to look up diagnoses aliases.
+    """
+    if diagnosis.isascii():
+        # single pass in C for the usual case
+        return diagnosis.translate(CANONICAL_ASCII_TABLE)
+    return "".join(char.lower() for char in diagnosis if char.isalpha())
+
+
+def canonicalize_email(email: str) -> str:
+    """
+    Return email address stripped and lowercased, emails are case-insensitive.
+    The "Undefined" placeholder for missing emails is kept as is.
+    """
+    return email if email == "Undefined" else email.strip().lower()
+
+
+def find_named_entity(entities: dict[str, OrganizationEntity], entity_class: type, name: str,
+                      create_mode: bool) -> Union[None, OrganizationEntity]:
+    """
+    Return entity keyed by name in given dict (e.g. Organization.groups).
+    If create_mode, add and return a new entity_class(name) if none found.
+    Shared by find_group(), find_department() and find_building().
+    """
+    # interned so the many repeats of a name in a report share one string
+    name = sys.intern(name) if name else "Undefined"
+    entity: OrganizationEntity = entities.get(name)
+    if entity is None and create_mode:
+        entity = entity_class(name)
+        entities[name] = entity
+    return entity
+
+
+def get_timestamp(date: datetime) -> int:
+    """
+    Given naive datetime, return microseconds since EPOCH.
+    Integers compare faster than datetimes and keep their order.
+    """
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+
+def set_filter_values(ticket: Ticket) -> None:
+    """
+    Set ticket's created_ts (integer copy of created time)
+    And canonical_diagnoses (set of canonical diagnosis names).
+    Called by Organization.add_new_ticket().
+    """
+    ticket.created_ts = get_timestamp(ticket.created) if ticket.created else None
+    diagnoses: list[str] = getattr(ticket, "diagnoses", None) or []
+    ticket.canonical_diagnoses = frozenset(canonicalize_diagnosis(diagnosis) for diagnosis in diagnoses)
+
+
+def get_created_ts(ticket: Ticket) -> Union[int, None]:
+    """
+    Return ticket's created_ts.
+    Computed on first use for tickets not added with Organization.add_new_ticket().
+    """
+    try:
+        return ticket.created_ts
+    except AttributeError:
+        set_filter_values(ticket)
+        return ticket.created_ts
+
+
+def get_canonical_diagnoses(ticket: Ticket) -> frozenset[str]:
+    """
+    Return ticket's canonical_diagnoses.
+    Computed on first use for tickets not added with Organization.add_new_ticket().
+    """
+    try:
+        return ticket.canonical_diagnoses
+    except AttributeError:
+        set_filter_values(ticket)
+        return ticket.canonical_diagnoses
+
+
 def get_monday(date: datetime) -> datetime:
     """
     Given datetime, return Monday midnight of that week.
     """
     date: datetime = datetime.combine(date, time(0, 0))
-    while datetime.weekday(date):
-        date -= timedelta(days=1)
-    return date
+    # weekday() is days since Monday
+    return date - timedelta(days=date.weekday())
 
 
 def filter_tickets(tickets: Union[dict[int, Ticket], list[Ticket]],
@@ -334,49 +422,47 @@ def filter_tickets(tickets: Union[dict[int, Ticket], list[Ticket]],
     Given an iterable (list or dict) of Tickets and args with filters,
     And an (optional) list of filters from args to exclude,
     Return a list containing only tickets that pass all filters.
+    Tickets need not have gone through Organization.add_new_ticket().
     """
+    return list(iter_filtered_tickets(tickets, args, exclude))
+
+
+def iter_filtered_tickets(tickets: Union[dict[int, Ticket], list[Ticket]],
+                          args: dict,
+                          exclude: list[str] = []) -> Iterator[Ticket]:
+    """
+    Same as filter_tickets(), but yield passing tickets one at a time.
+    Lets counting queries aggregate without building a filtered list.
+    """
+
+    # set user diagnoses and whether using "and" (match all) filtering
+    # canonicalized once per call, args are left as given
+    and_filtering: bool = False
+    given_diagnoses_set: frozenset[str] = frozenset()
+    if args.get("diagnoses"):
+        given_diagnoses_set = frozenset(canonicalize_diagnosis(diagnosis) for diagnosis in args["diagnoses"])
+    elif args.get("anddiagnoses"):
+        and_filtering = True
+        given_diagnoses_set = frozenset(canonicalize_diagnosis(diagnosis) for diagnosis in args["anddiagnoses"])
 
     def diagnoses_match(ticket: Ticket) -> bool:
         """
         Return True if user-given diagnoses match the ticket's diagnoses.
         Uses "diagnoses" or "anddiagnoses" filtering as applicable.
         """
-        # set user diagnoses and whether using "and" (match all) filtering`
-        and_filtering: bool = False
-        given_diagnoses: list[str]
-        if args.get("diagnoses"):
-            given_diagnoses = args["diagnoses"]
-        elif args.get("anddiagnoses"):
-            and_filtering = True
-            given_diagnoses = args["anddiagnoses"]
-        else:
+        if not given_diagnoses_set:
             # not using diagnoses filtering, so match guaranteed
             return True
 
-        # canonicalize user-given and ticket diagnoses for comparison
-        for i in range(len(given_diagnoses)):
-            given_diagnoses[i] = "".join(
-                char.lower() for char in given_diagnoses[i] if char.isalpha()
-            )
-        # copy list (not by reference), we can change it without affecting ticket data
-        ticket_diagnoses: list[str] = ticket.diagnoses[0:]
-        for i in range(len(ticket_diagnoses)):
-            ticket_diagnoses[i] = "".join(
-                char.lower() for char in ticket_diagnoses[i] if char.isalpha()
-            )
-
-        # perform filtering using set comparisons
-        ticket_diagnoses_set: set[str] = set(ticket_diagnoses)
-        given_diagnoses_set: set[str] = set(given_diagnoses)
-
-
-        if and_filtering and given_diagnoses_set.intersection(ticket_diagnoses_set) != given_diagnoses_set:
-            # ticket did not match all specified diagnoses ("and" filtering)
-            return False
-        elif not given_diagnoses_set.intersection(ticket_diagnoses_set):
-            # ticket did not match any of specified diagnoses
-            return False
-        return True
+        # ticket diagnoses were canonicalized when the ticket was added
+        ticket_diagnoses_set: frozenset[str] = get_canonical_diagnoses(ticket)
+
+        # perform filtering using set comparisons, no intermediate sets built
+        if and_filtering:
+            # ticket must match all specified diagnoses ("and" filtering)
+            return given_diagnoses_set.issubset(ticket_diagnoses_set)
+        # ticket must match any of specified diagnoses
+        return not given_diagnoses_set.isdisjoint(ticket_diagnoses_set)
 
     # setup values
     if type(tickets) == dict:
@@ -386,24 +472,35 @@ def filter_tickets(tickets: Union[dict[int, Ticket], list[Ticket]],
     building: Building = None if "building" in exclude else args.get("building")
 
     # requestor filter is list, as multiple matches are possible
-    requestors: list[User] = None if "requestors" in exclude else args.get("requestors")
+    # kept as a set so each ticket's check is a hash lookup, not a list scan
+    requestors: Union[frozenset[User], None] = None if "requestors" in exclude or not args.get("requestors") \
+        else frozenset(args["requestors"])
 
     # make term_end inclusive of last day
     if term_end:
         term_end += timedelta(days=1)
 
-    filtered: list[Ticket] = []
+    # compare as integers against each ticket's created_ts
+    term_start_ts: Union[int, None] = get_timestamp(term_start) if term_start else None
+    term_end_ts: Union[int, None] = get_timestamp(term_end) if term_end else None
+
+    # no active filters, every ticket passes
+    if not (requestors or building or term_start_ts is not None or term_end_ts is not None or given_diagnoses_set):
+        yield from tickets
+        return
+
+    # cheapest and most selective checks first, diagnoses (set comparison) last
     for ticket in tickets:
-        if building and ticket.room.building != building:
-            continue
         if requestors and ticket.requestor not in requestors:
             continue
-        if term_start and ticket.created < term_start:
+        if building and ticket.room.building != building:
+            continue
+        created_ts: int = get_created_ts(ticket)
+        if term_start_ts is not None and created_ts < term_start_ts:
             continue
-        if term_end and ticket.created > term_end:
+        if term_end_ts is not None and created_ts > term_end_ts:
             continue
-        if not diagnoses_match(ticket):
+        if given_diagnoses_set and not diagnoses_match(ticket):
             continue
-        # add ticket if it passes all filters
-        filtered.append(ticket)
-    return filtered
+        # ticket passes all filters
+        yield ticket
@@ -10,7 +10,6 @@ from the information in a given report.
 # Packages
 import sys
 import csv
-import typing
 import json
 
 # Files
@@ -20,29 +19,29 @@ from ticketclasses import *
 # Constants
 
 # match attribute names to TDX Academic Units Form names
-STANDARD_FIELDS: dict[str, list[str]] = {
-    "id": ["ID"],
-    "title": ["Title"],
-    "responsible_group": ["Resp Group"],
-    "requestor_name": ["Requestor"],
-    "requestor_email": ["Requestor Email"],
-    "requestor_phone": ["Requestor Phone"],
-    "department": ["Acct/Dept"],
-    "building": ["Location", "Class Support Building"],
-    "room_identifier": ["Location Room", "Room number"],
-    "diagnoses": ["Classroom Problem Types"],
-    "diagnoses_note": ["Classroom Support Other"],
-    "created": ["Created"],
-    "modified": ["Modified"],
-    "status": ["Status"]
+STANDARD_FIELDS: dict[str, tuple[str, ...]] = {
+    "id": ("ID",),
+    "title": ("Title",),
+    "responsible_group": ("Resp Group",),
+    "requestor_name": ("Requestor",),
+    "requestor_email": ("Requestor Email",),
+    "requestor_phone": ("Requestor Phone",),
+    "department": ("Acct/Dept",),
+    "building": ("Location", "Class Support Building"),
+    "room_identifier": ("Location Room", "Room number"),
+    "diagnoses": ("Classroom Problem Types",),
+    "diagnoses_note": ("Classroom Support Other",),
+    "created": ("Created",),
+    "modified": ("Modified",),
+    "status": ("Status",)
 }
 
-TIME_FORMATS: list[str] = [
+TIME_FORMATS: tuple[str, ...] = (
     # 12 hour
     "%Y-%m-%d %H:%M", "%m/%d/%Y %H:%M", "%m/%d/%y %H:%M", "%d.%m.%Y %H:%M", "%d.%m.%y %H:%M",
     # 24 hour
     "%Y-%m-%d %I:%M %p", "%m/%d/%Y %I:%M %p", "%m/%d/%y %I:%M %p", "%d.%m.%Y %I:%M %p", "%d.%m.%y %I:%M %p"
-]
+)
 
 
 class BadReportError(ValueError):
@@ -62,6 +61,7 @@ class Report:
     fields_present: list[str]
     filename = str
     diagnoses_aliases_filename = str
+    alias_mappings: Union[dict[str, str], None]
 
     def __init__(self, filename: str, diagnoses_aliases_filename: str = None):
         """
@@ -77,44 +77,54 @@ class Report:
         """
         self.filename = filename
         self.diagnoses_aliases_filename = diagnoses_aliases_filename if diagnoses_aliases_filename else None
+        # read from diagnoses aliases file on first use, once per Report
+        self.alias_mappings = None
 
         # set fields present and time format
-        csv_file: typing.TextIO = open(self.filename, mode="r", encoding="utf-8-sig")
-        any_ticket: dict = next(csv.DictReader(csv_file))
+        # check for at least one ticket up front, so populate() need not count rows
+        with open(self.filename, mode="r", encoding="utf-8-sig") as csv_file:
+            any_ticket: dict = next(csv.DictReader(csv_file), None)
+        if any_ticket is None:
+            raise BadReportError("Ticket report is empty, exiting...")
         self.fields_present = get_fields_present(any_ticket)
         self.time_format = get_time_format(any_ticket)
-        csv_file.close()
 
     def populate(self, org: Organization) -> None:
         """
         Given filename, read CSV.
         Populate buildings, rooms, tickets, etc. of given Organization.
         """
-        csv_file: typing.TextIO = open(self.filename, mode="r", encoding="utf-8-sig")
-        csv_tickets: csv.DictReader = csv.DictReader(csv_file)
-        count: int = 0
-        for row in csv_tickets:
-            # fix row to be a valid, clean ticket dict
-            new_ticket: Ticket = self.dict_to_ticket(org, row)
-            org.add_new_ticket(new_ticket)
-            count += 1
-        csv_file.close()
-        if not count:
-            raise BadReportError("Ticket report is empty, exiting...")
-
-    def dict_to_ticket(self, org: Organization, csv_ticket: dict) -> Ticket:
+        # rooms and requestors already resolved by their CSV values, rows repeat these heavily
+        lookup_memo: dict[tuple, OrganizationEntity] = {}
+        with open(self.filename, mode="r", encoding="utf-8-sig") as csv_file:
+            csv_tickets: csv.DictReader = csv.DictReader(csv_file)
+            # every row has the header's columns, so skip absent ones once here rather than per row
+            columns: dict[str, tuple[str, ...]] = get_report_columns(csv_tickets.fieldnames or [])
+            for row in csv_tickets:
+                # fix row to be a valid, clean ticket dict
+                new_ticket: Ticket = self.dict_to_ticket(org, row, lookup_memo, columns)
+                org.add_new_ticket(new_ticket)
+
+    def dict_to_ticket(self, org: Organization, csv_ticket: dict, lookup_memo: dict = None,
+                       columns: dict[str, tuple[str, ...]] = None) -> Ticket:
         """
         Given a dict representing a CSV row, convert to valid ticket.
         This does not add the ticket to the org's tickets dict,
         Nor does it add the ticket ot the on-campus entities' ticket lists.
+        Optional lookup_memo is shared across rows of one populate() on one org.
+        Optional columns (from get_report_columns()) limit which column names are tried.
         """
+        if lookup_memo is None:
+            lookup_memo = {}
+        if columns is None:
+            columns = STANDARD_FIELDS
 
         def get_attribute(attribute_name: str) -> Union[str, None]:
             """
             Return the desired attribute for the given csv_ticket.
             Returns string as stored in CSV or None if empty.
             """
-            for column_name in STANDARD_FIELDS[attribute_name]:
+            for column_name in columns[attribute_name]:
                 if csv_ticket.get(column_name):
                     return csv_ticket[column_name]
             return None
@@ -141,19 +151,17 @@ class Report:
             if not self.diagnoses_aliases_filename:
                 return diagnoses_list
 
-            aliases_file: typing.TextIO = open(self.diagnoses_aliases_filename, mode="r", encoding="utf-8-sig")
-            alias_mappings: dict[str, str] = json.load(aliases_file)
+            if self.alias_mappings is None:
+                self.alias_mappings = load_alias_mappings(self.diagnoses_aliases_filename)
+            alias_mappings: dict[str, str] = self.alias_mappings
             # replace diagnoses with display names from diagnoses aliases file
             # if no alias mapping, just keep original diagnosis name
             for i in range(len(diagnoses_list)):
                 # canonize string to use as key to find mapping
-                canon_diagnosis: str = "".join(
-                    char.lower() for char in diagnoses_list[i] if char.isalpha()
-                )
+                canon_diagnosis: str = canonicalize_diagnosis(diagnoses_list[i])
                 if alias_mappings.get(canon_diagnosis):
                     # replace with display name if one is given by aliases file
                     diagnoses_list[i] = alias_mappings[canon_diagnosis]
-            aliases_file.close()
             return diagnoses_list
 
         # new ticket
@@ -165,20 +173,28 @@ class Report:
         # use find methods set OrganizationEntity objects
         new_ticket.responsible_group = org.find_group(get_attribute("responsible_group"), create_mode=True)
         new_ticket.department = org.find_department(get_attribute("department"), create_mode=True)
-        new_ticket.room = org.find_room(get_attribute("building"),
-                                        get_attribute("room_identifier"), create_mode=True)
+        room_key: tuple[str, str, str] = ("room", get_attribute("building"), get_attribute("room_identifier"))
+        new_ticket.room = lookup_memo.get(room_key)
+        if new_ticket.room is None:
+            new_ticket.room = org.find_room(room_key[1], room_key[2], create_mode=True)
+            lookup_memo[room_key] = new_ticket.room
         # some extra steps for Requestor because find_user() takes multiple args
         # pass "Undefined" for blanks so no "partial matches" (e.g. same email but missing name)
-        requestor_email: str = get_attribute("requestor_email") if get_attribute("requestor_email") else "Undefined"
-        requestor_name: str = get_attribute("requestor_name") if get_attribute("requestor_name") else "Undefined"
-        requestor_phone: str = get_attribute("requestor_phone") if get_attribute("requestor_email") else "Undefined"
-        requestor_lookup: list[User] = org.find_user(requestor_email, requestor_name, requestor_phone, create_mode=True)
-        # make sure only 1 user is returned on find_user()
-        if len(requestor_lookup) != 1:
-            raise ValueError("""Multiple or no requestor objects found for one ticket in populate() method
+        requestor_email: str = get_attribute("requestor_email") or "Undefined"
+        requestor_name: str = get_attribute("requestor_name") or "Undefined"
+        requestor_phone: str = get_attribute("requestor_phone") or "Undefined"
+        requestor_key: tuple[str, str, str, str] = ("requestor", requestor_email, requestor_name, requestor_phone)
+        new_ticket.requestor = lookup_memo.get(requestor_key)
+        if new_ticket.requestor is None:
+            requestor_lookup: list[User] = org.find_user(requestor_email, requestor_name, requestor_phone,
+                                                         create_mode=True)
+            # make sure only 1 user is returned on find_user()
+            if len(requestor_lookup) != 1:
+                raise ValueError("""Multiple or no requestor objects found for one ticket in populate() method
 Possible bad usage of find_user() method""")
-        assert isinstance(requestor_lookup[0], User)
-        new_ticket.requestor = requestor_lookup[0]
+            assert isinstance(requestor_lookup[0], User)
+            new_ticket.requestor = requestor_lookup[0]
+            lookup_memo[requestor_key] = new_ticket.requestor
 
         # ID should be an int
         id_attribute: str = get_attribute("id")
@@ -186,9 +202,9 @@ Possible bad usage of find_user() method""")
 
         # Created and Modified should be datetime objects
         created_attribute: str = get_attribute("created")
-        new_ticket.created = datetime.strptime(created_attribute, self.time_format) if created_attribute else None
+        new_ticket.created = parse_time(created_attribute, self.time_format) if created_attribute else None
         modified_attribute: str = get_attribute("modified")
-        new_ticket.modified = datetime.strptime(modified_attribute, self.time_format) if modified_attribute else None
+        new_ticket.modified = parse_time(modified_attribute, self.time_format) if modified_attribute else None
 
         # diagnoses attribute should be set of valid diagnoses strings
         new_ticket.diagnoses = gen_diagnoses()
@@ -253,6 +269,26 @@ def get_fields_present(csv_ticket: dict) -> Union[list[str], None]:
     return fields_present
 
 
+def load_alias_mappings(aliases_filename: str) -> dict[str, str]:
+    """
+    Return the mappings in the given diagnoses aliases file.
+    The file is read on every call, callers keep the result as long as they need it.
+    """
+    with open(aliases_filename, mode="r", encoding="utf-8-sig") as aliases_file:
+        return json.loads(aliases_file.read())
+
+
+def get_report_columns(fieldnames: list[str]) -> dict[str, tuple[str, ...]]:
+    """
+    Given the column names in a report's header,
+    Return STANDARD_FIELDS narrowed to the columns actually present.
+    Column name order (new convention before legacy) is kept.
+    """
+    present: frozenset[str] = frozenset(fieldnames)
+    return {attribute: tuple(column_name for column_name in column_names if column_name in present)
+            for attribute, column_names in STANDARD_FIELDS.items()}
+
+
 def get_time_format(csv_ticket: dict) -> Union[str, None]:
     """
     Given an arbitrary csv_ticket dict from report,
@@ -267,10 +303,28 @@ def get_time_format(csv_ticket: dict) -> Union[str, None]:
     else:
         # no date attributes, so no time format to set
         return None
+    strptime = datetime.strptime
     for try_format in TIME_FORMATS:
         try:
-            datetime.strptime(time_text, try_format)
+            strptime(time_text, try_format)
             return try_format
         except ValueError:
             continue
     raise BadReportError(f"Time {time_text} in report is not a valid time format")
+
+
+def parse_time(time_text: str, time_format: str) -> datetime:
+    """
+    Parse a report time with the report's time format.
+    Padded times in the first of TIME_FORMATS go through fromisoformat,
+    which is much faster than strptime for every row.
+    Any other shape (seconds, no time, offsets) is left to strptime.
+    """
+    if (time_format == TIME_FORMATS[0] and len(time_text) == 16 and time_text[4] == "-"
+            and time_text[7] == "-" and time_text[10] == " " and time_text[13] == ":"):
+        try:
+            return datetime.fromisoformat(time_text)
+        except ValueError:
+            # e.g. unpadded 2023-4-4 10:00, which strptime still accepts
+            pass
+    return datetime.strptime(time_text, time_format)
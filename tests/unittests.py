@@ -24,6 +24,7 @@ import unittest
 
 # import tstat Python files
 from report import *
+from visual import *
 from cli import *
 
 class TestOrganization(unittest.TestCase):
@@ -56,6 +57,7 @@ class TestOrganization(unittest.TestCase):
         ticket.department = dept1
         ticket.created = datetime(2020, 1, 1)
         ticket.modified = datetime(2020, 1, 1)
+        ticket.diagnoses = ["Cable--HDMI", "Projector"]
 
         org.add_new_ticket(ticket)
 
@@ -65,6 +67,12 @@ class TestOrganization(unittest.TestCase):
         self.assertEqual(group1.tickets, [ticket])
         self.assertEqual(dept1.tickets, [ticket])
         self.assertEqual(org.tickets[1], ticket)
+        self.assertEqual(org.earliest_created, datetime(2020, 1, 1))
+
+        # canonical diagnoses set on add, so diagnoses filters work
+        self.assertEqual(ticket.canonical_diagnoses, frozenset({"cablehdmi", "projector"}))
+        self.assertEqual(filter_tickets(org.tickets, {"diagnoses": ["projector"]}), [ticket])
+        self.assertEqual(filter_tickets(org.tickets, {"diagnoses": ["Touch Panel"]}), [])
 
     def test_find_group(self):
         """
@@ -141,6 +149,10 @@ class TestOrganization(unittest.TestCase):
         my_user: User = my_user_list[0]
         self.assertEqual(my_user, new_user)
 
+        # emails match regardless of case and surrounding whitespace
+        my_user_list = org.find_user(" RealEmail@Email.net ")
+        self.assertEqual(my_user_list, [new_user])
+
         # also works with name or phone or both
         my_user = org.find_user(name="AJ")[0]
         self.assertEqual(my_user, new_user)
@@ -305,6 +317,29 @@ class TestOrganization(unittest.TestCase):
         self.assertEqual(get_monday(datetime(2023, 7, 27), ), datetime(2023, 7, 24))
         self.assertEqual(get_monday(datetime(2023, 6, 26), ), datetime(2023, 6, 26))
         self.assertEqual(get_monday(datetime(2023, 7, 23), ), datetime(2023, 7, 17))
+        # time of day dropped, weeks crossing month and year boundaries
+        self.assertEqual(get_monday(datetime(2023, 7, 23, 23, 59)), datetime(2023, 7, 17))
+        self.assertEqual(get_monday(datetime(2023, 8, 2, 10, 41)), datetime(2023, 7, 31))
+        self.assertEqual(get_monday(datetime(2024, 1, 1, 8, 0)), datetime(2024, 1, 1))
+        self.assertEqual(get_monday(datetime(2023, 1, 1)), datetime(2022, 12, 26))
+
+    def test_get_timestamp(self):
+        """
+        Test cases for get_timestamp() helper function.
+        """
+        self.assertEqual(get_timestamp(datetime(1970, 1, 1)), 0)
+        self.assertEqual(get_timestamp(datetime(1970, 1, 2, 0, 0, 1)), 86_401_000_000)
+        self.assertLess(get_timestamp(datetime(2023, 7, 14, 10, 41)), get_timestamp(datetime(2023, 7, 14, 10, 42)))
+
+    def test_canonicalize_diagnosis(self):
+        """
+        Test cases for canonicalize_diagnosis() helper function.
+        """
+        self.assertEqual(canonicalize_diagnosis("Cable--HDMI"), "cablehdmi")
+        self.assertEqual(canonicalize_diagnosis(" TV Display"), "tvdisplay")
+        self.assertEqual(canonicalize_diagnosis("Blu-ray/DVD Player"), "bluraydvdplayer")
+        self.assertEqual(canonicalize_diagnosis(""), "")
+        self.assertEqual(canonicalize_diagnosis("Café Display 2"), "cafédisplay")
 
     def test_filter_tickets(self):
         """
@@ -415,6 +450,15 @@ class TestOrganization(unittest.TestCase):
             filtered: list[Ticket] = filter_tickets(type, args)
             self.assertEqual(filtered, expected)
 
+        # ticket not added with add_new_ticket() still filters
+        ticket: Ticket = Ticket()
+        ticket.created = datetime(2023, 5, 1)
+        ticket.diagnoses = ["Projector"]
+        args = {"termstart": datetime(2023, 4, 11), "diagnoses": ["projector"]}
+        self.assertEqual(filter_tickets([ticket], args), [ticket])
+        args = {"termend": datetime(2023, 4, 11)}
+        self.assertEqual(filter_tickets([ticket], args), [])
+
 
 class TestQueries(unittest.TestCase):
     """
@@ -610,6 +654,20 @@ class TestQueries(unittest.TestCase):
         args: dict = {"querytype": "showtickets", "debug": True, "nographics": True}
         self.assertEqual(filter_tickets(org.tickets, args), run_query(args, org))
 
+    def test_per_diagnosis(self):
+        """
+        Test cases for per_diagnosis() method.
+        """
+        # setup
+        report = Report("querytests1.csv")
+        org = Organization()
+        report.populate(org)
+
+        # tickets with several diagnoses count once per diagnosis, blank diagnoses not counted
+        args: dict = {"querytype": "perdiagnosis", "debug": True, "nographics": True}
+        expected: dict = {"Touch Panel": 2, "Cable-Ethernet": 2, "Cable--HDMI": 2, "Projector": 2}
+        self.assertEqual(run_query(args, org), expected)
+
     def test_per_room(self):
         """
         Test cases for per_room() method.
@@ -804,6 +862,7 @@ class TestCli(unittest.TestCase):
         self.assertRaises(BadArgError, get_datetime, "19700101")
         self.assertRaises(BadArgError, get_datetime, "January 1, 1970")
         self.assertRaises(BadArgError, get_datetime, "31/12/1970")
+        self.assertRaises(BadArgError, get_datetime, "2023-W01-1")
 
         # good date formats
         self.assertEqual(datetime(2020, 12, 31), get_datetime("2020-12-31"))
@@ -812,6 +871,16 @@ class TestCli(unittest.TestCase):
         self.assertEqual(datetime(2020, 12, 31), get_datetime("31.12.2020"))
         self.assertEqual(datetime(2020, 12, 31), get_datetime("31.12.20"))
 
+        # unpadded dates
+        self.assertEqual(datetime(2023, 5, 1), get_datetime("5/1/2023"))
+        self.assertEqual(datetime(2023, 5, 1), get_datetime("1.5.23"))
+        self.assertEqual(datetime(2023, 5, 1), get_datetime("2023-5-1"))
+        self.assertEqual(datetime(2023, 5, 1), get_datetime("5/1/23"))
+
+        # space-padded day, as strptime accepts
+        self.assertEqual(datetime(2023, 1, 5), get_datetime("1/ 5/2023"))
+        self.assertEqual(datetime(2023, 1, 5), get_datetime("2023-1- 5"))
+
         # expected errors from main()
         argv: list[str] = ["--debug", "--nographics", "--querytype", "perweek", "-t", "19700101", "--localreport",
                            "minimal.csv"]
@@ -845,6 +914,13 @@ class TestCli(unittest.TestCase):
                 "--localreport", "minimal.csv"]
         self.assertRaises(BadArgError, main, argv)
 
+        # perdiagnosis and showtickets stipulations
+        argv = ["--debug", "--nographics", "-q", "perdiagnosis", "--diagnoses", "Projector",
+                "--localreport", "minimal.csv"]
+        self.assertRaises(BadArgError, main, argv)
+        argv = ["--debug", "--nographics", "-q", "showtickets", "--prune", "true", "--localreport", "minimal.csv"]
+        self.assertRaises(BadArgError, main, argv)
+
         # saveconfig stipulations
         # provide none of --localreport, --saveconfig, --config
         argv = ["--debug", "--nographics", "-q", "perweek", "--head", "10"]
@@ -869,6 +945,16 @@ class TestCli(unittest.TestCase):
         expected: dict = {"building": mybuilding}
         self.assertEqual(args, expected)
 
+        # diagnoses split, canonicalized and empty names dropped
+        args: dict = {"anddiagnoses": "Projector,TV Display, ,"}
+        clean_args(args, org)
+        expected: dict = {"anddiagnoses": ["projector", "tvdisplay"]}
+        self.assertEqual(args, expected)
+
+        # no valid diagnoses at all is an error, not an unfiltered query
+        self.assertRaises(BadArgError, clean_args, {"anddiagnoses": ","}, org)
+        self.assertRaises(BadArgError, clean_args, {"diagnoses": "123"}, org)
+
     def test_check_report(self):
         """
         Test cases for check_report() function.
@@ -893,7 +979,8 @@ class TestCli(unittest.TestCase):
         args = {"querytype": "perbuilding"}
         self.assertRaises(BadArgError, check_report, args, report)
         args = {"querytype": "perroom", "building": "The Building"}
-        self.assertRaises(BadArgError, check_report, args, report)
+        self.assertRaisesRegex(BadArgError, 'no "Location" and "Location Room" fields in report',
+                               check_report, args, report)
 
     def test_save_config(self):
         """
@@ -1116,7 +1203,8 @@ class TestReport(unittest.TestCase):
         expected = [(ticket.room, org.find_room("The Building", "111")),
                     (ticket.responsible_group, org.find_group("USS-Classrooms")),
                     (ticket.requestor, org.find_user("example@example.com")[0]),
-                    (ticket.department, org.find_department("Based Department"))]
+                    (ticket.department, org.find_department("Based Department")),
+                    (ticket.diagnoses, ["Cable--HDMI", "Touch Panel"])]
 
         for pair in expected:
             self.assertEqual(pair[0], pair[1])
@@ -1130,6 +1218,12 @@ class TestReport(unittest.TestCase):
         ticket = report.dict_to_ticket(org, old_nomenclature_dict)
         self.assertEqual(ticket.room, org.find_room("Another Building", "99"))
 
+        # requestor phone kept even when requestor email is blank
+        no_email_dict: dict = {"ID": "12345679", "Requestor": "Madam Example", "Requestor Phone": "5551234567"}
+        ticket = report.dict_to_ticket(org, no_email_dict)
+        self.assertEqual(ticket.requestor.email, "Undefined")
+        self.assertEqual(ticket.requestor.phone, "5551234567")
+
         # test that old nomenclature not used if new nomenclature present
         mixed_nomenclature_dict: dict = {
             "Class Support Building": "Incorrect Building",
@@ -1155,6 +1249,43 @@ class TestReport(unittest.TestCase):
         part_report: Report = Report("missing-fields.csv")
         self.assertEqual(part_report.fields_present, ["id", "title", "responsible_group", "department", "status"])
         self.assertEqual(part_report.time_format, None)
+        # report with a header but no tickets
+        self.assertRaises(BadReportError, Report, "empty.csv")
+
+    def test_load_alias_mappings(self):
+        """
+        Test cases for load_alias_mappings() function.
+        """
+        alias_mappings: dict[str, str] = load_alias_mappings("example-daliases.json")
+        self.assertEqual(alias_mappings, {"alias": "Alias"})
+
+        # each call gives its own dict, changing one does not affect later callers
+        alias_mappings.clear()
+        self.assertEqual(load_alias_mappings("example-daliases.json"), {"alias": "Alias"})
+
+    def test_get_report_columns(self):
+        """
+        Test cases for get_report_columns() function.
+        """
+        columns: dict = get_report_columns(["ID", "Class Support Building", "Location", "Created"])
+        self.assertEqual(columns["id"], ("ID",))
+        self.assertEqual(columns["building"], ("Location", "Class Support Building"))
+        self.assertEqual(columns["room_identifier"], ())
+        self.assertEqual(columns["created"], ("Created",))
+
+    def test_parse_time(self):
+        """
+        Test cases for parse_time() function.
+        """
+        self.assertEqual(parse_time("2023-07-14 10:41", "%Y-%m-%d %H:%M"), datetime(2023, 7, 14, 10, 41))
+        self.assertEqual(parse_time("2023-7-4 10:41", "%Y-%m-%d %H:%M"), datetime(2023, 7, 4, 10, 41))
+        self.assertEqual(parse_time("7/14/2023 10:41", "%m/%d/%Y %H:%M"), datetime(2023, 7, 14, 10, 41))
+        self.assertRaises(ValueError, parse_time, "7/14/2023 10:41", "%Y-%m-%d %H:%M")
+        # shapes fromisoformat would accept are still rejected
+        self.assertRaises(ValueError, parse_time, "2023-07-14 10:41:59", "%Y-%m-%d %H:%M")
+        self.assertRaises(ValueError, parse_time, "2023-07-14", "%Y-%m-%d %H:%M")
+        self.assertRaises(ValueError, parse_time, "2023-07-14T10:41", "%Y-%m-%d %H:%M")
+        self.assertRaises(ValueError, parse_time, "2023-07-14 10:41+02:00", "%Y-%m-%d %H:%M")
 
 class TestVisual(unittest.TestCase):
     """
@@ -17,9 +17,12 @@ class OrganizationEntity:
     """
     Abstract class for an entity within the organization.
     e.g. buildings, users, groups, departments, etc.
+    Entities (and tickets) use __slots__, there are many of them per report.
     """
+    __slots__ = ()
 
 class Building(OrganizationEntity):
+    __slots__ = ("name", "rooms")
     name: str
     rooms: dict[str, "Room"]
 
@@ -35,6 +38,7 @@ class Building(OrganizationEntity):
 
 
 class Room(OrganizationEntity):
+    __slots__ = ("building", "identifier", "tickets")
     building: Building
     identifier: str
     tickets: list["Ticket"]
@@ -55,6 +59,7 @@ class User(OrganizationEntity):
     """
     A TDX user (typically as requestor on a ticket).
     """
+    __slots__ = ("email", "name", "phone", "tickets")
     email: str
     name: str
     phone: str
@@ -77,6 +82,7 @@ class Group(OrganizationEntity):
     """
     A TDX group (typically as Resp Group on a ticket).
     """
+    __slots__ = ("name", "tickets")
     name: str
     tickets: list["Ticket"]
 
@@ -95,6 +101,7 @@ class Department(OrganizationEntity):
     """
     A TDX department (typically listed under requestor on a ticket).
     """
+    __slots__ = ("name", "tickets")
     name: str
     tickets: list["Ticket"]
 
@@ -119,6 +126,8 @@ class Status(Enum):
     OTHER = 6
 
 class Ticket:
+    __slots__ = ("id", "title", "responsible_group", "requestor", "department", "room", "created", "created_ts",
+                 "modified", "diagnoses", "canonical_diagnoses", "diagnoses_note", "status")
     id: int
     title: str
     responsible_group: Group
@@ -126,8 +135,10 @@ class Ticket:
     department: Department
     room: Room
     created: datetime
+    created_ts: int
     modified: datetime
     diagnoses: list[str]
+    canonical_diagnoses: frozenset[str]
     diagnoses_note: str
     status: Status
 
@@ -8,8 +8,8 @@ Visualizes the data in appropriate format.
 """
 
 # import libraries
+from collections import defaultdict
 from datetime import *
-import io
 from matplotlib import pyplot
 from ticketclasses import *
 
@@ -22,6 +22,8 @@ DEFAULT_NAMES = {"perweek": "Tickets per Week",
                  "perdiagnosis": "Tickets per Diagnosis"
                  }
 PRUNE_COUNT = 15
+# query types whose (long) bar labels get rotated
+ROTATED_LABEL_QUERIES = frozenset({"perbuilding", "perroom", "perrequestor", "perdiagnosis"})
 
 
 def view_per_week(tickets_per_week: dict[datetime, int], args: dict) -> None:
@@ -143,13 +145,11 @@ def bar_view(bar_labels: list[str], bar_heights: list[int], args: dict) -> None:
     bar_labels, bar_heights = crop_counts(bar_labels, bar_heights, args)
 
     # differentiate duplicate labels to prevent matplotlib grouping them
-    dupes: dict[str, int]= {}
-    for i in range(len(bar_labels)):
-        if not dupes.get(bar_labels[i]):
-            dupes[bar_labels[i]] = 1
-        else:
-            dupes[bar_labels[i]] += 1
-            bar_labels[i] = f"{bar_labels[i]} ({dupes[bar_labels[i]]})"
+    dupes: defaultdict[str, int] = defaultdict(int)
+    for i, label in enumerate(bar_labels):
+        dupes[label] += 1
+        if dupes[label] > 1:
+            bar_labels[i] = f"{label} ({dupes[label]})"
 
     # initialize the graph
     fig, ax = pyplot.subplots(figsize=(10, 5))
@@ -176,7 +176,7 @@ def bar_view(bar_labels: list[str], bar_heights: list[int], args: dict) -> None:
             fontsize="medium"
         )
 
-    if args["querytype"] in ["perbuilding", "perroom", "perrequestor", "perdiagnosis"]:
+    if args["querytype"] in ROTATED_LABEL_QUERIES:
         # adjust for long building names
         # FIXME take in building name abbreviations
         pyplot.xticks(rotation=45, ha='right')